@@ -1,88 +1,426 @@
 # app.py - Vercel Compatible
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from array import array
+from collections import defaultdict, deque
+from functools import lru_cache
+from itertools import islice
+import atexit
+import hashlib
+import heapq
+import hmac
 import json
+import math
+import orjson
 import os
-from datetime import datetime, timedelta
-import random
-import string
+from datetime import datetime
+import queue
+import secrets
+import threading
+import time
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
 CORS(app)
 
 DATA_FILE = '/tmp/atm_data.json'  # Vercel mein /tmp use karna padta hai
+TX_LOG_FILE = '/tmp/atm_transactions.log'  # append-only, ek line = ek transaction
+SESSION_TTL = 1800  # seconds
+LOCK_DURATION = 1800  # seconds
 
-def load_data():
-    try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-    except:
-        pass
+def _empty_data():
     return {
         'accounts': {},
-        'transactions': [],
         'failed_attempts': {},
         'locked_accounts': {},
         'session_tokens': {}
     }
 
-def save_data(data):
+def _non_finite_to_zero(constant):
+    print(f"Warning: {constant} in {DATA_FILE} replaced with 0.0")
+    return 0.0
+
+def load_data():
+    if not os.path.exists(DATA_FILE):
+        return _empty_data()
+    with open(DATA_FILE, 'rb') as f:
+        raw = f.read()
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        pass
+    try:
+        # Purani stdlib json files mein NaN/Infinity ho sakte hain, jo orjson nahi padhta
+        return json.loads(raw, parse_constant=_non_finite_to_zero)
+    except ValueError as e:
+        # Kharab file ko khali snapshot se overwrite na karo, side mein rakh do
+        bad_file = f'{DATA_FILE}.corrupt-{int(time.time())}'
+        os.replace(DATA_FILE, bad_file)
+        print(f"Error loading data: {e}; moved to {bad_file}")
+    return _empty_data()
+
+def _atomic_write(buf):
+    tmp_file = DATA_FILE + '.tmp'
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, buf)
+            os.fsync(fd)
+            # File sirf startup pe padhi jaati hai, page cache mein rakhne ka faida nahi
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, DATA_FILE)
     except Exception as e:
         print(f"Error saving data: {e}")
 
-def init_data():
-    data = load_data()
-    save_data(data)
+class TxStore:
+    # Transactions column-wise rakhe jaate hain; row number hi transaction ka handle hai
+    OPTIONAL_FIELDS = ('account_number', 'from_account', 'to_account', 'note')
+
+    def __init__(self):
+        self.id = []
+        self.type = []
+        self.amount = array('d')
+        self.timestamp = []
+        self.balance_after = array('d')
+        self.account_number = []
+        self.from_account = []
+        self.to_account = []
+        self.note = []
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, transaction):
+        # Pehle saari values nikaal lo taake KeyError pe columns aage peeche na hon
+        tx_id, tx_type = transaction['id'], transaction['type']
+        amount, balance_after = float(transaction['amount']), float(transaction['balance_after'])
+        timestamp = transaction['timestamp']
+        self.id.append(tx_id)
+        self.type.append(tx_type)
+        self.amount.append(amount)
+        self.timestamp.append(timestamp)
+        self.balance_after.append(balance_after)
+        for field in self.OPTIONAL_FIELDS:
+            getattr(self, field).append(transaction.get(field))
+        return len(self.id) - 1
+
+    def row(self, i):
+        transaction = {
+            'id': self.id[i],
+            'type': self.type[i],
+            'amount': self.amount[i],
+            'timestamp': self.timestamp[i],
+            'balance_after': self.balance_after[i]
+        }
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)[i]
+            if value is not None:
+                transaction[field] = value
+        return transaction
+
+def load_transactions():
+    transactions = TxStore()
+    if os.path.exists(TX_LOG_FILE):
+        with open(TX_LOG_FILE, 'r+b') as f:
+            data = f.read()
+            # Crash ke baad adhi likhi aakhri line kaat do, warna agli line usi se jud jaati
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(end)
+            for line in data[:end].splitlines():
+                try:
+                    transactions.append(orjson.loads(line))
+                except (KeyError, TypeError, ValueError):
+                    pass  # adhi likhi ya kharab line; orjson.JSONDecodeError bhi ValueError hai
+    return transactions
+
+def _index_transaction(row):
+    accounts = {
+        _TRANSACTIONS.account_number[row],
+        _TRANSACTIONS.from_account[row],
+        _TRANSACTIONS.to_account[row]
+    }
+    accounts.discard(None)
+    for account_number in accounts:
+        _TX_BY_ACCT[account_number].append(row)
+
+def append_transaction(transaction):
+    # Disk pe writer thread likhta hai; yahan sirf memory aur pending list
+    row = _TRANSACTIONS.append(transaction)
+    _index_transaction(row)
+    _pending_tx.append(orjson.dumps(transaction))
+
+def _write_transactions(lines):
+    if not lines:
+        return True
+    try:
+        with open(TX_LOG_FILE, 'ab') as f:
+            start = f.tell()
+            try:
+                f.write(b'\n'.join(lines) + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception:
+                # Adha likha batch hata do taake retry pe line na jude
+                f.truncate(start)
+                raise
+        return True
+    except Exception as e:
+        print(f"Error saving transactions: {e}")
+        return False
+
+# Data ek baar load hota hai aur memory mein rehta hai; disk pe sirf flusher likhta hai
+_DB = load_data()
+_TRANSACTIONS = load_transactions()
+_DB_LOCK = threading.RLock()
+_FLUSH_LOCK = threading.Lock()
+_write_q = queue.Queue()
+_pending_tx = []  # log mein likhne wale transactions
+
+# account_number -> us account ki transaction rows, purane se naye tak
+_TX_BY_ACCT = defaultdict(lambda: deque(maxlen=10000))
+for _row in range(len(_TRANSACTIONS)):
+    _index_transaction(_row)
+
+# Purani data file mein transactions hon to unhe log mein shift karo
+_legacy_transactions = _DB.pop('transactions', None)
+if _legacy_transactions and not _TRANSACTIONS:
+    for _transaction in _legacy_transactions:
+        append_transaction(_transaction)
+
+# Purane sessions mein expires_at ISO string tha, ab epoch float hai
+for _session in _DB['session_tokens'].values():
+    if isinstance(_session['expires_at'], str):
+        _session['expires_at'] = datetime.fromisoformat(_session['expires_at']).timestamp()
+
+# Session mein account dict ka seedha reference, taake har request pe ek hi lookup ho
+for _token, _session in list(_DB['session_tokens'].items()):
+    if _session['account_number'] in _DB['accounts']:
+        _session['account'] = _DB['accounts'][_session['account_number']]
+    else:
+        del _DB['session_tokens'][_token]
+
+# Purane locked_accounts mein lock ka waqt ISO string tha, ab unlock ka epoch float hai
+for _acc_num, _locked_at in _DB['locked_accounts'].items():
+    if isinstance(_locked_at, str):
+        _DB['locked_accounts'][_acc_num] = datetime.fromisoformat(_locked_at).timestamp() + LOCK_DURATION
+
+# ETag ke liye har account ka version; restart pe purane ETags match na hon is liye boot id
+_BOOT_ID = secrets.token_hex(4)
+_acct_version = defaultdict(int)
+
+def _bump_version(account_number):
+    _acct_version[account_number] += 1
+
+def _account_etag(kind, account_number):
+    # kind se balance aur account-info ke ETags alag rehte hain
+    return f'{kind}-{account_number}-{_BOOT_ID}-{_acct_version[account_number]}'
+
+def _request_token():
+    # GET pe token Authorization header mein, POST pe JSON body mein
+    if request.method == 'GET':
+        auth = request.headers.get('Authorization', '')
+        return auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+    return request.get_json().get('token')
 
-init_data()
+def _conditional_response(response, etag, cache_control):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    # GET/HEAD pe werkzeug 304 banata hai (W/, lists, * sab samajhta hai, headers rakhta hai)
+    if request.method in ('GET', 'HEAD'):
+        return response.make_conditional(request)
+    # RFC 9110: baaki methods pe If-None-Match match ho to 412
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=412)
+    return response
+
+# (expires_at, token) ka min-heap, expired sessions hatane ke liye
+_expiry_heap = [(session['expires_at'], token) for token, session in _DB['session_tokens'].items()]
+heapq.heapify(_expiry_heap)
+
+def _mark_dirty():
+    _write_q.put(None)
+
+def _drain(q, max_items=256):
+    drained = 0
+    while drained < max_items:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            break
+        drained += 1
+    return drained
+
+def _snapshot():
+    # Session ka account reference disk pe nahi jata, woh accounts mein already hai
+    data = dict(_DB)
+    data['session_tokens'] = {
+        token: {key: value for key, value in session.items() if key != 'account'}
+        for token, session in _DB['session_tokens'].items()
+    }
+    return data
+
+def _flush():
+    # Writer thread aur atexit dono yahan aa sakte hain
+    with _FLUSH_LOCK:
+        with _DB_LOCK:
+            tx_lines = _pending_tx[:]
+            _pending_tx.clear()
+            buf = orjson.dumps(_snapshot(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        # Pehle log, phir snapshot, taake snapshot kabhi log se aage na ho
+        if not _write_transactions(tx_lines):
+            with _DB_LOCK:
+                _pending_tx[:0] = tx_lines
+            return
+        _atomic_write(buf)
+
+def _writer_loop():
+    # Jitne bhi requests ne data badla ho, sab ke liye ek hi write
+    while True:
+        _write_q.get()
+        _drain(_write_q)
+        _flush()
+
+def _session_sweeper():
+    while True:
+        time.sleep(60)
+        now = time.time()
+        swept = False
+        with _DB_LOCK:
+            while _expiry_heap and _expiry_heap[0][0] < now:
+                _, token = heapq.heappop(_expiry_heap)
+                session = _DB['session_tokens'].get(token)
+                if session is None:
+                    continue
+                if session['expires_at'] < now:
+                    del _DB['session_tokens'][token]
+                    swept = True
+                else:
+                    # Session beech mein refresh hua tha
+                    heapq.heappush(_expiry_heap, (session['expires_at'], token))
+            if swept:
+                _mark_dirty()
+
+_flush()
+threading.Thread(target=_writer_loop, daemon=True).start()
+threading.Thread(target=_session_sweeper, daemon=True).start()
+# Band hote waqt jo abhi queue mein hai woh bhi disk pe chala jaye
+atexit.register(_flush)
 
 def check_account_lock(account_number):
-    data = load_data()
-    if account_number in data['locked_accounts']:
-        lock_time = datetime.fromisoformat(data['locked_accounts'][account_number])
-        if datetime.now() < lock_time + timedelta(minutes=30):
-            remaining = (lock_time + timedelta(minutes=30) - datetime.now()).seconds // 60
-            return True, remaining
-        else:
+    with _DB_LOCK:
+        data = _DB
+        unlock_at = data['locked_accounts'].get(account_number)
+        now = time.time()
+        if unlock_at and now < unlock_at:
+            return True, int((unlock_at - now) // 60)
+        elif unlock_at:
             del data['locked_accounts'][account_number]
-            if account_number in data['failed_attempts']:
-                del data['failed_attempts'][account_number]
-            save_data(data)
+            data['failed_attempts'].pop(account_number, None)
+            _mark_dirty()
     return False, 0
 
-def reset_daily_limits():
-    data = load_data()
-    now = datetime.now()
-    for acc_num, account in data['accounts'].items():
+# last_reset jaise timestamps baar baar parse hote hain
+_iso = lru_cache(maxsize=4096)(datetime.fromisoformat)
+
+def _maybe_reset(account_number, account):
+    # Daily limit sirf usi account ka reset karo jo abhi use ho raha hai
+    try:
+        stale = g.now.date() > _iso(account['last_reset']).date()
+    except (KeyError, TypeError, ValueError):
+        stale = True
+    if stale:
+        account['daily_withdrawn'] = 0.00
+        account['last_reset'] = g.now_iso
+        _bump_version(account_number)
+        _mark_dirty()
+
+# 4 digit PIN ke liye argon2id, ~20-25ms per verify
+_ph = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_pin(pin):
+    return _ph.hash(pin)
+
+def _check_pin_hash(pin_hash, pin):
+    if pin_hash.startswith('$argon2'):
         try:
-            last_reset = datetime.fromisoformat(account['last_reset'])
-            if now.date() > last_reset.date():
-                account['daily_withdrawn'] = 0.00
-                account['last_reset'] = now.isoformat()
-        except:
-            account['daily_withdrawn'] = 0.00
-            account['last_reset'] = now.isoformat()
-    save_data(data)
+            return _ph.verify(pin_hash, pin)
+        except (VerificationError, InvalidHashError):
+            return False
+    # Purane werkzeug (scrypt/pbkdf2) hashes
+    return check_password_hash(pin_hash, pin)
+
+def _needs_rehash(pin_hash):
+    return not pin_hash.startswith('$argon2') or _ph.check_needs_rehash(pin_hash)
+
+# Sahi PIN ka HMAC thodi der ke liye yaad rakho taake har login pe KDF na chale
+PIN_CACHE_TTL = 300
+_pin_cache = {}
+# change-pin pe badhta hai; lock ke bahar chale verify purane PIN ko cache/commit na kar saken
+_pin_generation = defaultdict(int)
+
+def _pin_digest(pin):
+    key = app.secret_key if isinstance(app.secret_key, bytes) else app.secret_key.encode()
+    return hmac.new(key, pin.encode(), 'sha256').digest()
+
+def verify_pin(account_number, pin_hash, generation, pin):
+    # _DB_LOCK ke bahar chalta hai; pin_hash aur generation caller lock mein padhta hai
+    digest = _pin_digest(pin)
+    cached = _pin_cache.get(account_number)
+    if (cached and cached[2] == generation and time.time() < cached[1]
+            and hmac.compare_digest(cached[0], digest)):
+        return True
+    if _check_pin_hash(pin_hash, pin):
+        _pin_cache[account_number] = (digest, time.time() + PIN_CACHE_TTL, generation)
+        return True
+    return False
 
 def generate_transaction_id():
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+    return secrets.token_hex(6).upper()
+
+def generate_session_token():
+    return secrets.token_hex(16)
 
 def generate_account_number():
-    data = load_data()
     while True:
-        acc_num = ''.join(random.choices(string.digits, k=6))
-        if acc_num not in data['accounts']:
+        acc_num = f'{secrets.randbelow(1_000_000):06d}'
+        if acc_num not in _DB['accounts']:
             return acc_num
 
+@app.before_request
+def _stamp_request_time():
+    # Ek request mein ek hi "abhi" use hota hai
+    now = datetime.now()
+    g.now = now
+    g.now_iso = now.isoformat()
+    g.now_ts = now.timestamp()
+
+# Template mein koi variable nahi, ek baar render kar ke rakh lo
+with app.app_context():
+    _INDEX_HTML = render_template('index.html')
+_INDEX_ETAG = hashlib.sha1(_INDEX_HTML.encode()).hexdigest()
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    if app.debug:
+        return render_template('index.html')
+    response = Response(_INDEX_HTML, mimetype='text/html')
+    return _conditional_response(response, _INDEX_ETAG, 'public, max-age=3600')
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -98,51 +436,57 @@ def register():
         if not pin or len(pin) != 4 or not pin.isdigit():
             return jsonify({'success': False, 'message': 'PIN must be 4 digits'}), 400
         
+        if not math.isfinite(initial_deposit):
+            return jsonify({'success': False, 'message': 'Invalid initial deposit'}), 400
+        
         if initial_deposit < 0:
             return jsonify({'success': False, 'message': 'Initial deposit cannot be negative'}), 400
         
-        db_data = load_data()
-        account_number = generate_account_number()
+        pin_hash = hash_pin(pin)
         
-        db_data['accounts'][account_number] = {
-            'pin_hash': generate_password_hash(pin),
-            'balance': initial_deposit,
-            'name': name,
-            'account_type': 'Savings',
-            'daily_limit': 5000.00,
-            'daily_withdrawn': 0.00,
-            'last_reset': datetime.now().isoformat(),
-            'created_at': datetime.now().isoformat(),
-            'preferences': {
-                'fast_cash_amount': 100,
-                'receipt_enabled': True,
-                'language': 'en'
-            }
-        }
-        
-        if initial_deposit > 0:
-            transaction = {
-                'id': generate_transaction_id(),
-                'type': 'deposit',
-                'amount': initial_deposit,
-                'timestamp': datetime.now().isoformat(),
-                'balance_after': initial_deposit,
-                'account_number': account_number,
-                'note': 'Initial deposit'
-            }
-            db_data['transactions'].append(transaction)
-        
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'message': 'Account created successfully',
-            'account': {
-                'number': account_number,
+        with _DB_LOCK:
+            db_data = _DB
+            account_number = generate_account_number()
+
+            db_data['accounts'][account_number] = {
+                'pin_hash': pin_hash,
+                'balance': initial_deposit,
                 'name': name,
-                'balance': initial_deposit
+                'account_type': 'Savings',
+                'daily_limit': 5000.00,
+                'daily_withdrawn': 0.00,
+                'last_reset': g.now_iso,
+                'created_at': g.now_iso,
+                'preferences': {
+                    'fast_cash_amount': 100,
+                    'receipt_enabled': True,
+                    'language': 'en'
+                }
             }
-        })
+
+            if initial_deposit > 0:
+                transaction = {
+                    'id': generate_transaction_id(),
+                    'type': 'deposit',
+                    'amount': initial_deposit,
+                    'timestamp': g.now_iso,
+                    'balance_after': initial_deposit,
+                    'account_number': account_number,
+                    'note': 'Initial deposit'
+                }
+                append_transaction(transaction)
+
+            _mark_dirty()
+
+            return jsonify({
+                'success': True,
+                'message': 'Account created successfully',
+                'account': {
+                    'number': account_number,
+                    'name': name,
+                    'balance': initial_deposit
+                }
+            })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -164,58 +508,84 @@ def login():
                 'locked': True
             }), 403
         
-        db_data = load_data()
-        
-        if account_number not in db_data['accounts']:
-            return jsonify({'success': False, 'message': 'Account not found'}), 404
-        
-        account = db_data['accounts'][account_number]
-        
-        if check_password_hash(account['pin_hash'], pin):
-            if account_number in db_data['failed_attempts']:
-                del db_data['failed_attempts'][account_number]
-            
-            session_token = generate_transaction_id()
-            db_data['session_tokens'][session_token] = {
-                'account_number': account_number,
-                'created_at': datetime.now().isoformat(),
-                'expires_at': (datetime.now() + timedelta(minutes=30)).isoformat()
-            }
-            
-            save_data(db_data)
-            reset_daily_limits()
-            
-            return jsonify({
-                'success': True,
-                'token': session_token,
-                'account': {
-                    'number': account_number,
-                    'name': account['name'],
-                    'type': account['account_type'],
-                    'balance': account['balance']
-                }
-            })
-        else:
-            if account_number not in db_data['failed_attempts']:
-                db_data['failed_attempts'][account_number] = 0
-            db_data['failed_attempts'][account_number] += 1
-            
-            attempts_remaining = 3 - db_data['failed_attempts'][account_number]
-            
-            if db_data['failed_attempts'][account_number] >= 3:
-                db_data['locked_accounts'][account_number] = datetime.now().isoformat()
-                save_data(db_data)
+        with _DB_LOCK:
+            db_data = _DB
+
+            if account_number not in db_data['accounts']:
+                return jsonify({'success': False, 'message': 'Account not found'}), 404
+
+            account = db_data['accounts'][account_number]
+            pin_hash = account['pin_hash']
+            generation = _pin_generation[account_number]
+
+        # KDF lock ke bahar, taake baaki requests na rukein
+        pin_ok = verify_pin(account_number, pin_hash, generation, pin)
+        new_hash = hash_pin(pin) if pin_ok and _needs_rehash(pin_hash) else None
+
+        with _DB_LOCK:
+            # Beech mein kisi aur request ne account lock kar diya ho
+            is_locked, minutes_remaining = check_account_lock(account_number)
+            if is_locked:
                 return jsonify({
                     'success': False,
-                    'message': 'Account locked due to 3 failed attempts. Try after 30 minutes.',
+                    'message': f'Account locked. Try again in {minutes_remaining} minutes.',
                     'locked': True
                 }), 403
-            
-            save_data(db_data)
-            return jsonify({
-                'success': False,
-                'message': f'Invalid PIN. {attempts_remaining} attempts remaining.'
-            }), 401
+
+            # Beech mein PIN badal gaya ho to purane PIN se login nahi
+            if _pin_generation[account_number] != generation:
+                pin_ok = False
+
+            if pin_ok:
+                if new_hash and account['pin_hash'] == pin_hash:
+                    account['pin_hash'] = new_hash
+
+                if account_number in db_data['failed_attempts']:
+                    del db_data['failed_attempts'][account_number]
+
+                session_token = generate_session_token()
+                expires_at = g.now_ts + SESSION_TTL
+                db_data['session_tokens'][session_token] = {
+                    'account': account,
+                    'account_number': account_number,
+                    'created_at': g.now_iso,
+                    'expires_at': expires_at
+                }
+                heapq.heappush(_expiry_heap, (expires_at, session_token))
+
+                _mark_dirty()
+
+                return jsonify({
+                    'success': True,
+                    'token': session_token,
+                    'account': {
+                        'number': account_number,
+                        'name': account['name'],
+                        'type': account['account_type'],
+                        'balance': account['balance']
+                    }
+                })
+            else:
+                if account_number not in db_data['failed_attempts']:
+                    db_data['failed_attempts'][account_number] = 0
+                db_data['failed_attempts'][account_number] += 1
+
+                attempts_remaining = 3 - db_data['failed_attempts'][account_number]
+
+                if db_data['failed_attempts'][account_number] >= 3:
+                    db_data['locked_accounts'][account_number] = g.now_ts + LOCK_DURATION
+                    _mark_dirty()
+                    return jsonify({
+                        'success': False,
+                        'message': 'Account locked due to 3 failed attempts. Try after 30 minutes.',
+                        'locked': True
+                    }), 403
+
+                _mark_dirty()
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid PIN. {attempts_remaining} attempts remaining.'
+                }), 401
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -225,43 +595,45 @@ def logout():
         data = request.get_json()
         token = data.get('token')
         
-        db_data = load_data()
-        if token in db_data['session_tokens']:
-            del db_data['session_tokens'][token]
-            save_data(db_data)
-        
-        return jsonify({'success': True})
+        with _DB_LOCK:
+            db_data = _DB
+            if token in db_data['session_tokens']:
+                del db_data['session_tokens'][token]
+                _mark_dirty()
+
+            return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/balance', methods=['POST'])
+@app.route('/api/balance', methods=['GET', 'POST'])
 def get_balance():
     try:
-        data = request.get_json()
-        token = data.get('token')
-        
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        if datetime.now() > datetime.fromisoformat(session_data['expires_at']):
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
+        token = _request_token()
         
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'balance': account['balance'],
-            'daily_limit': account['daily_limit'],
-            'daily_remaining': account['daily_limit'] - account['daily_withdrawn'],
-            'account_type': account['account_type']
-        })
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+            _maybe_reset(account_number, account)
+
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
+            etag = _account_etag('bal', account_number)
+
+            response = jsonify({
+                'success': True,
+                'balance': account['balance'],
+                'daily_limit': account['daily_limit'],
+                'daily_remaining': account['daily_limit'] - account['daily_withdrawn'],
+                'account_type': account['account_type']
+            })
+            return _conditional_response(response, etag, 'private, no-cache')
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -273,54 +645,57 @@ def withdraw():
         amount = float(data.get('amount', 0))
         note = data.get('note', '')
         
-        if amount <= 0:
+        if not math.isfinite(amount) or amount <= 0:
             return jsonify({'success': False, 'message': 'Invalid amount'}), 400
         
         if amount > 10000:
             return jsonify({'success': False, 'message': 'Maximum withdrawal limit is $10,000 per transaction'}), 400
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        if account['daily_withdrawn'] + amount > account['daily_limit']:
-            remaining = account['daily_limit'] - account['daily_withdrawn']
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+            _maybe_reset(account_number, account)
+
+            if account['daily_withdrawn'] + amount > account['daily_limit']:
+                remaining = account['daily_limit'] - account['daily_withdrawn']
+                return jsonify({
+                    'success': False,
+                    'message': f'Daily limit exceeded. Remaining: ${remaining:.2f}'
+                }), 400
+
+            if amount > account['balance']:
+                return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
+
+            account['balance'] -= amount
+            account['daily_withdrawn'] += amount
+            _bump_version(account_number)
+
+            transaction = {
+                'id': generate_transaction_id(),
+                'type': 'withdrawal',
+                'amount': amount,
+                'timestamp': g.now_iso,
+                'balance_after': account['balance'],
+                'account_number': account_number,
+                'note': note
+            }
+
+            append_transaction(transaction)
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
             return jsonify({
-                'success': False,
-                'message': f'Daily limit exceeded. Remaining: ${remaining:.2f}'
-            }), 400
-        
-        if amount > account['balance']:
-            return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
-        
-        account['balance'] -= amount
-        account['daily_withdrawn'] += amount
-        
-        transaction = {
-            'id': generate_transaction_id(),
-            'type': 'withdrawal',
-            'amount': amount,
-            'timestamp': datetime.now().isoformat(),
-            'balance_after': account['balance'],
-            'account_number': account_number,
-            'note': note
-        }
-        
-        db_data['transactions'].append(transaction)
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'new_balance': account['balance'],
-            'transaction_id': transaction['id'],
-            'timestamp': transaction['timestamp']
-        })
+                'success': True,
+                'new_balance': account['balance'],
+                'transaction_id': transaction['id'],
+                'timestamp': transaction['timestamp']
+            })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -332,43 +707,45 @@ def deposit():
         amount = float(data.get('amount', 0))
         note = data.get('note', '')
         
-        if amount <= 0:
+        if not math.isfinite(amount) or amount <= 0:
             return jsonify({'success': False, 'message': 'Invalid amount'}), 400
         
         if amount > 50000:
             return jsonify({'success': False, 'message': 'Maximum deposit limit is $50,000 per transaction'}), 400
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        account['balance'] += amount
-        
-        transaction = {
-            'id': generate_transaction_id(),
-            'type': 'deposit',
-            'amount': amount,
-            'timestamp': datetime.now().isoformat(),
-            'balance_after': account['balance'],
-            'account_number': account_number,
-            'note': note
-        }
-        
-        db_data['transactions'].append(transaction)
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'new_balance': account['balance'],
-            'transaction_id': transaction['id'],
-            'timestamp': transaction['timestamp']
-        })
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+
+            account['balance'] += amount
+            _bump_version(account_number)
+
+            transaction = {
+                'id': generate_transaction_id(),
+                'type': 'deposit',
+                'amount': amount,
+                'timestamp': g.now_iso,
+                'balance_after': account['balance'],
+                'account_number': account_number,
+                'note': note
+            }
+
+            append_transaction(transaction)
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
+            return jsonify({
+                'success': True,
+                'new_balance': account['balance'],
+                'transaction_id': transaction['id'],
+                'timestamp': transaction['timestamp']
+            })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -381,55 +758,58 @@ def transfer():
         amount = float(data.get('amount', 0))
         note = data.get('note', '')
         
-        if amount <= 0:
+        if not math.isfinite(amount) or amount <= 0:
             return jsonify({'success': False, 'message': 'Invalid amount'}), 400
         
         if amount > 10000:
             return jsonify({'success': False, 'message': 'Maximum transfer limit is $10,000 per transaction'}), 400
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        from_account = session_data['account_number']
-        
-        if from_account == to_account:
-            return jsonify({'success': False, 'message': 'Cannot transfer to same account'}), 400
-        
-        if to_account not in db_data['accounts']:
-            return jsonify({'success': False, 'message': 'Recipient account not found'}), 404
-        
-        sender = db_data['accounts'][from_account]
-        
-        if amount > sender['balance']:
-            return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
-        
-        sender['balance'] -= amount
-        db_data['accounts'][to_account]['balance'] += amount
-        
-        transaction = {
-            'id': generate_transaction_id(),
-            'type': 'transfer',
-            'amount': amount,
-            'timestamp': datetime.now().isoformat(),
-            'from_account': from_account,
-            'to_account': to_account,
-            'balance_after': sender['balance'],
-            'note': note
-        }
-        
-        db_data['transactions'].append(transaction)
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'new_balance': sender['balance'],
-            'transaction_id': transaction['id'],
-            'timestamp': transaction['timestamp']
-        })
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            from_account = session_data['account_number']
+
+            if from_account == to_account:
+                return jsonify({'success': False, 'message': 'Cannot transfer to same account'}), 400
+
+            if to_account not in db_data['accounts']:
+                return jsonify({'success': False, 'message': 'Recipient account not found'}), 404
+
+            sender = session_data['account']
+
+            if amount > sender['balance']:
+                return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
+
+            sender['balance'] -= amount
+            db_data['accounts'][to_account]['balance'] += amount
+            _bump_version(from_account)
+            _bump_version(to_account)
+
+            transaction = {
+                'id': generate_transaction_id(),
+                'type': 'transfer',
+                'amount': amount,
+                'timestamp': g.now_iso,
+                'from_account': from_account,
+                'to_account': to_account,
+                'balance_after': sender['balance'],
+                'note': note
+            }
+
+            append_transaction(transaction)
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
+            return jsonify({
+                'success': True,
+                'new_balance': sender['balance'],
+                'transaction_id': transaction['id'],
+                'timestamp': transaction['timestamp']
+            })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -440,30 +820,37 @@ def get_transactions():
         token = data.get('token')
         limit = data.get('limit', 10)
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        
-        account_transactions = [
-            t for t in db_data['transactions'] 
-            if t.get('account_number') == account_number or 
-               t.get('from_account') == account_number or 
-               t.get('to_account') == account_number
-        ]
-        
-        account_transactions.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'transactions': account_transactions[:limit]
-        })
+        # limit null ho to saare transactions
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'message': 'Invalid limit'}), 400
+            if limit < 0:
+                return jsonify({'success': False, 'message': 'Invalid limit'}), 400
+        
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+
+            rows = list(islice(reversed(_TX_BY_ACCT.get(account_number, ())), limit))
+
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
+        # TxStore append-only hai, is liye rows lock ke bahar padhna safe hai
+        def generate():
+            yield b'{"success":true,"transactions":['
+            for n, i in enumerate(rows):
+                yield (b',' if n else b'') + orjson.dumps(_TRANSACTIONS.row(i))
+            yield b']}'
+
+        return Response(generate(), mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -478,21 +865,33 @@ def change_pin():
         if not new_pin or len(new_pin) != 4 or not new_pin.isdigit():
             return jsonify({'success': False, 'message': 'PIN must be 4 digits'}), 400
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        if not check_password_hash(account['pin_hash'], current_pin):
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+            pin_hash = account['pin_hash']
+            generation = _pin_generation[account_number]
+
+        # KDF lock ke bahar, taake baaki requests na rukein
+        if not current_pin or not verify_pin(account_number, pin_hash, generation, current_pin):
             return jsonify({'success': False, 'message': 'Current PIN incorrect'}), 401
-        
-        account['pin_hash'] = generate_password_hash(new_pin)
-        save_data(db_data)
-        
+
+        new_hash = hash_pin(new_pin)
+
+        with _DB_LOCK:
+            if _pin_generation[account_number] != generation:
+                return jsonify({'success': False, 'message': 'PIN was changed by another request, try again'}), 409
+
+            account['pin_hash'] = new_hash
+            _pin_generation[account_number] += 1
+            _pin_cache.pop(account_number, None)
+            _mark_dirty()
+
         return jsonify({'success': True, 'message': 'PIN changed successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -503,77 +902,84 @@ def fast_cash():
         data = request.get_json()
         token = data.get('token')
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        amount = account['preferences']['fast_cash_amount']
-        
-        if amount > account['balance']:
-            return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
-        
-        if account['daily_withdrawn'] + amount > account['daily_limit']:
-            return jsonify({'success': False, 'message': 'Daily limit exceeded'}), 400
-        
-        account['balance'] -= amount
-        account['daily_withdrawn'] += amount
-        
-        transaction = {
-            'id': generate_transaction_id(),
-            'type': 'fast_cash',
-            'amount': amount,
-            'timestamp': datetime.now().isoformat(),
-            'balance_after': account['balance'],
-            'account_number': account_number
-        }
-        
-        db_data['transactions'].append(transaction)
-        db_data['session_tokens'][token]['expires_at'] = (datetime.now() + timedelta(minutes=30)).isoformat()
-        save_data(db_data)
-        
-        return jsonify({
-            'success': True,
-            'amount': amount,
-            'new_balance': account['balance'],
-            'transaction_id': transaction['id']
-        })
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+            _maybe_reset(account_number, account)
+
+            amount = account['preferences']['fast_cash_amount']
+
+            if amount > account['balance']:
+                return jsonify({'success': False, 'message': 'Insufficient funds'}), 400
+
+            if account['daily_withdrawn'] + amount > account['daily_limit']:
+                return jsonify({'success': False, 'message': 'Daily limit exceeded'}), 400
+
+            account['balance'] -= amount
+            account['daily_withdrawn'] += amount
+            _bump_version(account_number)
+
+            transaction = {
+                'id': generate_transaction_id(),
+                'type': 'fast_cash',
+                'amount': amount,
+                'timestamp': g.now_iso,
+                'balance_after': account['balance'],
+                'account_number': account_number
+            }
+
+            append_transaction(transaction)
+            session_data['expires_at'] = g.now_ts + SESSION_TTL
+            _mark_dirty()
+
+            return jsonify({
+                'success': True,
+                'amount': amount,
+                'new_balance': account['balance'],
+                'transaction_id': transaction['id']
+            })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/account-info', methods=['POST'])
+@app.route('/api/account-info', methods=['GET', 'POST'])
 def get_account_info():
     try:
-        data = request.get_json()
-        token = data.get('token')
+        token = _request_token()
         
-        db_data = load_data()
-        
-        if token not in db_data['session_tokens']:
-            return jsonify({'success': False, 'message': 'Session expired'}), 401
-        
-        session_data = db_data['session_tokens'][token]
-        account_number = session_data['account_number']
-        account = db_data['accounts'][account_number]
-        
-        return jsonify({
-            'success': True,
-            'account': {
-                'number': account_number,
-                'name': account['name'],
-                'type': account['account_type'],
-                'balance': account['balance'],
-                'daily_limit': account['daily_limit'],
-                'created_at': account['created_at']
-            }
-        })
+        with _DB_LOCK:
+            db_data = _DB
+
+            session_data = db_data['session_tokens'].get(token)
+            if not session_data or g.now_ts > session_data['expires_at']:
+                return jsonify({'success': False, 'message': 'Session expired'}), 401
+
+            account_number = session_data['account_number']
+            account = session_data['account']
+
+            etag = _account_etag('info', account_number)
+
+            response = jsonify({
+                'success': True,
+                'account': {
+                    'number': account_number,
+                    'name': account['name'],
+                    'type': account['account_type'],
+                    'balance': account['balance'],
+                    'daily_limit': account['daily_limit'],
+                    'created_at': account['created_at']
+                }
+            })
+            return _conditional_response(response, etag, 'private, no-cache')
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # Vercel ke liye required
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Reloader doosra process chalata hai jo wahi files likhta; is liye band
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', use_reloader=False)
\ No newline at end of file
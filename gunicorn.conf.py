@@ -0,0 +1,10 @@
+# gunicorn.conf.py - gunicorn app:app
+# Saara state (accounts, sessions, transactions) process ki memory mein hai,
+# is liye ek hi worker; concurrency threads se aati hai.
+bind = '0.0.0.0:5000'
+workers = 1
+worker_class = 'gthread'
+threads = 8
+# preload_app nahi: writer aur sweeper threads import pe start hote hain,
+# aur fork ke baad woh sirf master mein reh jaate.
+preload_app = False